@@ -1,63 +1,85 @@
 # app/controllers/app_controller.py
 
 import time
+import orjson
 import psutil
-from datetime import datetime
-from fastapi import APIRouter, Request, HTTPException, Path
+from fastapi import APIRouter, Request, Response, HTTPException, Path
+from app.utils.json_response import ORJSONResponse
 
 from app.constants.pin_constants import BULB_PINS, SWITCH_PINS
-from app.models.models import ApplicationInfo, HealthCheck, GPIOStatus
+from app.models.models import ApplicationInfo, HealthCheck
 from app.core.config import settings
+from app.middlewares.etag_middleware import compute_etag
+from app.utils.clock_service import now_iso
 
-router = APIRouter()
+router = APIRouter(default_response_class = ORJSONResponse)
+
+# Process handle and start time are invariant for the process lifetime
+_PROCESS = psutil.Process()
+_PROCESS_START_TIME = _PROCESS.create_time()
+_MEMORY_PERCENT_FACTOR = 100.0 / psutil.virtual_memory().total
+
+# Application info never changes while the process runs, serialize it once
+_ROOT_BODY = orjson.dumps(ApplicationInfo(
+    message = "Raspberry Pi GPIO Controller",
+    version = "1.0.0",
+    device_id = settings.device_id,
+    switches = len(SWITCH_PINS),
+    bulbs = len(BULB_PINS),
+    status = "running"
+).model_dump())
+_ROOT_ETAG = compute_etag(_ROOT_BODY)
+
+
+def _tagged_json_response(content) -> ORJSONResponse:
+    """Serialize once and tag the body so the ETag middleware does not buffer it again"""
+    response = ORJSONResponse(content)
+    response.headers["ETag"] = compute_etag(response.body)
+    return response
 
 
 @router.get("/", response_model = ApplicationInfo)
 async def get_root():
     """Get application information"""
-    return ApplicationInfo(
-        message = "Raspberry Pi GPIO Controller",
-        version = "1.0.0",
-        device_id = settings.device_id,
-        switches = len(SWITCH_PINS),
-        bulbs = len(BULB_PINS),
-        status = "running",
-        timestamp = datetime.now().isoformat()
-    )
-
-
-@router.get("/health", response_model = HealthCheck)
+    return Response(content = _ROOT_BODY, media_type = "application/json", headers = {"ETag": _ROOT_ETAG})
+
+
+@router.get("/health")
 async def get_health():
     """Get application health status"""
-    process = psutil.Process()
-    memory_info = process.memory_info()
-
-    return HealthCheck(
-        status = "healthy",
-        timestamp = datetime.now().isoformat(),
-        uptime = time.time() - process.create_time(),
-        memory = {
+    memory_info = _PROCESS.memory_info()
+
+    health: HealthCheck = {
+        "status": "healthy",
+        "timestamp": now_iso(),
+        "uptime": time.time() - _PROCESS_START_TIME,
+        "memory": {
             "rss": memory_info.rss,
             "vms": memory_info.vms,
-            "percent": process.memory_percent()
+            "percent": memory_info.rss * _MEMORY_PERCENT_FACTOR
         }
-    )
+    }
+    # Uptime changes on every call, an ETag could never match
+    return ORJSONResponse(health, headers = {"Cache-Control": "no-store"})
 
 
-@router.get("/status", response_model = GPIOStatus)
+@router.get("/status")
 async def get_status(request: Request):
     """Get GPIO service status"""
     gpio_service = request.app.state.gpio_service
-    status_data = gpio_service.get_status()
-    return GPIOStatus(**status_data)
+    return _tagged_json_response(gpio_service.get_status())
 
 
 @router.get("/test/switch/{index}")
 async def test_switch(
         request: Request,
+        response: Response,
         index: int = Path(..., ge = 1, le = len(SWITCH_PINS), description = f"Switch index (1-{len(SWITCH_PINS)})")
 ):
     """Test switch press simulation"""
+    # Every call triggers a press, never answer it from a cached ETag
+    response.headers["Cache-Control"] = "no-store"
+
     gpio_service = request.app.state.gpio_service
     try:
         result = await gpio_service.handle_switch_press(index)
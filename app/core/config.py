@@ -1,6 +1,6 @@
 # app/core/config.py
 
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
 DEFAULT_ENVIRONMENT = "production"
@@ -14,21 +14,27 @@ class Settings(BaseSettings):
     company_id: str = Field(default = "", env = "COMPANY_ID")
 
     # Database Configuration
-    database_url: str = Field(default = "sqlite://", env = "DATABASE_URL")
+    database_url: str = Field(default = "sqlite:///./data/dev.db", env = "DATABASE_URL")
+    database_echo: bool = Field(default = False, env = "DATABASE_ECHO")
+    database_create_tables: bool = Field(default = True, env = "DATABASE_CREATE_TABLES")
 
     # Application Configuration
     port: int = Field(default = 3000, env = "PORT")
-    time_on_bulb: int = Field(default = 2.0, env = "TIME_ON_BULB", ge = 0)
+    time_on_bulb: float = Field(default = 2.0, env = "TIME_ON_BULB", ge = 0)
     environment: str = Field(default = DEFAULT_ENVIRONMENT, env = "ENVIRONMENT")
 
     # GPIO Configuration
     enable_gpio: bool = Field(default = True, env = "ENABLE_GPIO")
 
+    # Debug Configuration
+    dump_users_on_startup: bool = Field(default = False, env = "DUMP_USERS_ON_STARTUP")
 
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
-        extra = "ignore"
+    model_config = SettingsConfigDict(
+        env_file = ".env",
+        case_sensitive = False,
+        extra = "ignore",
+        frozen = True
+    )
 
 
 settings = Settings()
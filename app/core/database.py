@@ -1,15 +1,33 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from sqlalchemy import (
-    create_engine,
+    event,
     MetaData,
     Table,
     Column,
     Integer,
     String,
     DateTime,
-    func
+    func,
+    inspect
 )
-from sqlalchemy.engine import Engine
-from app.core.config import settings, is_prod_env
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+from app.core.config import settings
+from app.utils.logger_service import logger
+
+# Configuración del pool de conexiones
+DB_POOL_SIZE = 5
+DB_MAX_OVERFLOW = 10
+DB_POOL_TIMEOUT = 30
+DB_POOL_RECYCLE = 1800
+
+# Las operaciones en exceso esperan en el semáforo y no en el pool
+MAX_CONCURRENT_DB_OPS = DB_POOL_SIZE - 1
 
 # Configuración de metadatos
 metadata = MetaData()
@@ -20,53 +38,142 @@ users_table = Table(
     metadata,
     Column("id", Integer, primary_key=True, autoincrement=True),
     Column("userId", String, unique=True, nullable=False),
-    Column("location", String, nullable=False),  # JSON string
+    Column("locationId", String, nullable=False),
+    Column("locationName", String, nullable=False),
+    Column("locationNumber", Integer, nullable=False),
     Column("accessToken", String, nullable=False),
     Column("switchInput", Integer, nullable=False),
     Column("createdAt", DateTime, default=func.now()),
 )
 
+
+def _async_database_url(database_url: str) -> str:
+    """Usa el driver aiosqlite para las URLs de SQLite"""
+    if database_url.startswith("sqlite://"):
+        return database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return database_url
+
+
+def _drop_outdated_tables(sync_connection) -> None:
+    """Elimina las tablas cuyo esquema cambió, los usuarios se vuelven a sincronizar desde la API"""
+    inspector = inspect(sync_connection)
+    for table in metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        if existing_columns != set(table.columns.keys()):
+            logger.warning(f"⚠️ Dropping table '{table.name}': its columns do not match the current schema")
+            table.drop(sync_connection)
+
+
+def _set_sqlite_pragmas(dbapi_connection, _connection_record) -> None:
+    """Configura los pragmas una sola vez por conexión del pool"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-64000")
+    cursor.close()
+
+
+def _is_memory_database(database_url: str) -> bool:
+    """Indica si la URL apunta a una base SQLite en memoria"""
+    return make_url(database_url).database in (None, "", ":memory:")
+
+
+def _pool_options(database_url: str) -> dict:
+    """Opciones del pool según el tipo de base de datos"""
+    if _is_memory_database(database_url):
+        # Una base en memoria solo existe dentro de su única conexión
+        return {"poolclass": StaticPool}
+
+    return {
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
 class Database:
     def __init__(self):
         place_database_url = settings.database_url or "sqlite:///:memory:"
 
-        self.engine: Engine = create_engine(
-            place_database_url,
-            echo = not is_prod_env
+        async_database_url = _async_database_url(place_database_url)
+
+        self.database_path = None if _is_memory_database(async_database_url) else make_url(async_database_url).database
+
+        # echo registra cada sentencia SQL, solo se activa bajo demanda
+        self.engine: AsyncEngine = create_async_engine(
+            async_database_url,
+            echo = settings.database_echo,
+            connect_args = {"timeout": 30},
+            **_pool_options(async_database_url)
         )
+        self.session_maker = async_sessionmaker(self.engine, expire_on_commit = False)
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_DB_OPS)
 
-        # Crear todas las tablas
-        metadata.create_all(self.engine)
+        # Las conexiones del pool conservan los pragmas y la caché de páginas
+        event.listen(self.engine.sync_engine, "connect", _set_sqlite_pragmas)
 
-    def connect(self):
-        """Retorna una conexión a la base de datos"""
-        return self.engine.connect()
+    async def connect(self):
+        """Abre la primera conexión del pool"""
+        if self.database_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.database_path)), exist_ok = True)
+
+        async with self.engine.connect():
+            pass
+
+    async def create_tables(self):
+        """Recrea las tablas con un esquema desactualizado y crea las que aún no existen"""
+        async with self.engine.begin() as connection:
+            await connection.run_sync(_drop_outdated_tables)
+            await connection.run_sync(metadata.create_all)
 
     def get_engine(self):
         """Retorna el engine de SQLAlchemy"""
         return self.engine
 
-    def fetch_one(self, query):
+    async def fetch_one(self, query, values = None):
         """Ejecuta una consulta y retorna un único resultado"""
-        with self.engine.connect() as connection:
-            result = connection.execute(query)
+        async with self._semaphore, self.session_maker() as session:
+            result = await session.execute(query, values)
             return result.fetchone()
 
-    def fetch_all(self, query):
+    async def fetch_all(self, query, values = None):
         """Ejecuta una consulta y retorna todos los resultados"""
-        with self.engine.connect() as connection:
-            result = connection.execute(query)
+        async with self._semaphore, self.session_maker() as session:
+            result = await session.execute(query, values)
             return result.fetchall()
 
-    def execute(self, query):
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[AsyncSession]:
+        """Agrupa varias sentencias en una sola transacción con un único commit"""
+        async with self._semaphore, self.session_maker.begin() as session:
+            yield session
+
+    async def execute(self, query):
         """Ejecuta una consulta sin retornar resultados"""
-        with self.engine.begin() as connection:
-            connection.execute(query)
+        async with self.transaction() as session:
+            await session.execute(query)
 
-    def close(self):
-        """Cierra la conexión a la base de datos"""
-        self.engine.dispose()
+    async def execute_many(self, query, values):
+        """Ejecuta una consulta una vez por cada conjunto de parámetros"""
+        async with self.transaction() as session:
+            await session.execute(query, values)
+
+    async def disconnect(self):
+        """Cierra el pool de conexiones de la base de datos"""
+        await self.engine.dispose()
         print("Database connection closed.")
 
 # Exportar la instancia de database
 database = Database()
+
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """Dependencia de FastAPI que entrega una sesión asíncrona, limitada por el mismo semáforo"""
+    async with database._semaphore, database.session_maker() as session:
+        yield session
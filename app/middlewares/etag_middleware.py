@@ -0,0 +1,48 @@
+# app/middlewares/etag_middleware.py
+
+import hashlib
+
+from fastapi import Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+
+def compute_etag(body: bytes) -> str:
+    """Return a strong ETag for the given response body"""
+    return f'"{hashlib.blake2b(body, digest_size = 16).hexdigest()}"'
+
+
+class ETagMiddleware(BaseHTTPMiddleware):
+    """Answer conditional GET requests with 304 when the body did not change"""
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        response = await call_next(request)
+
+        if (
+                request.method != "GET"
+                or response.status_code != 200
+                or response.headers.get("cache-control") == "no-store"
+        ):
+            return response
+
+        # Precomputed ETag set by the route, no need to hash the body
+        etag = response.headers.get("etag")
+        if etag is not None:
+            if request.headers.get("if-none-match") == etag:
+                return Response(status_code = 304, headers = {"ETag": etag})
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        etag = compute_etag(body)
+
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code = 304, headers = {"ETag": etag})
+
+        headers = dict(response.headers)
+        headers["ETag"] = etag
+
+        return Response(
+            content = body,
+            status_code = response.status_code,
+            headers = headers,
+            media_type = response.media_type
+        )
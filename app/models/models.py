@@ -1,7 +1,7 @@
 # app/models/models.py
 
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, TypedDict
 from pydantic import BaseModel
 
 
@@ -22,8 +22,9 @@ class ApiResponse(BaseModel):
     users: List[ApiUser]
 
 
-class SwitchEventPayload(BaseModel):
-    location: UserLocation
+# Built per switch press from already validated user data
+class SwitchEventPayload(TypedDict):
+    location: Dict[str, Any]
     branchId: str
     isMultiService: bool
     status: str
@@ -32,7 +33,9 @@ class SwitchEventPayload(BaseModel):
 class User(BaseModel):
     id: Optional[int] = None
     userId: str
-    location: str  # JSON string
+    locationId: str
+    locationName: str
+    locationNumber: int
     accessToken: str
     switchInput: int
     createdAt: Optional[datetime] = None
@@ -45,17 +48,17 @@ class ApplicationInfo(BaseModel):
     switches: int
     bulbs: int
     status: str
-    timestamp: str
 
 
-class HealthCheck(BaseModel):
+# Status payloads come from trusted internal code, they are typed but not validated
+class HealthCheck(TypedDict):
     status: str
     timestamp: str
     uptime: float
     memory: Dict[str, Any]
 
 
-class GPIOStatus(BaseModel):
+class GPIOStatus(TypedDict):
     gpioAvailable: bool
     mode: str
     isMonitoring: bool
@@ -1,6 +1,7 @@
 # app/services/api_service.py
 
 import httpx
+import orjson
 from app.utils.logger_service import logger
 from typing import Dict, Any
 
@@ -13,51 +14,68 @@ class ApiService:
         self.api_url = settings.api_url
         self.api_endpoint = settings.api_endpoint
         self.device_id = settings.device_id
+        self.company_id = settings.company_id
         self.user_agent = f"RaspberryPi-GPIO-Controller/1.0/{self.device_id}"
         self.timeout = httpx.Timeout(30.0)
 
+        # Request headers built once, per access token for switch events
+        self._headers = {
+            "Content-Type": "application/json",
+            "User-Agent": self.user_agent,
+        }
+        self._event_headers: Dict[str, Dict[str, str]] = {}
+
+        # Shared client keeps connections alive between requests
+        self._client = httpx.AsyncClient(
+            timeout = self.timeout,
+            http2 = True,
+            limits = httpx.Limits(max_keepalive_connections = 8, max_connections = 16)
+        )
+
     async def fetch_users(self) -> ApiResponse:
         """Fetch users from the API"""
         url = f"{self.api_url}/{self.api_endpoint}"
         logger.info("📡 Fetching users")
 
-        headers = {
-            "Content-Type": "application/json",
-            "User-Agent": self.user_agent,
-        }
-
         payload = {"branchId": self.device_id}
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(url, json=payload, headers=headers)
+        response = await self._client.post(url, json=payload, headers=self._headers)
 
-            if response.status_code != 201:
-                raise Exception(f"API returned status {response.status_code}")
+        if response.status_code != 201:
+            raise Exception(f"API returned status {response.status_code}")
 
-            logger.info("✅ Successfully fetched users from API")
-            return ApiResponse(**response.json())
+        logger.info("✅ Successfully fetched users from API")
+        return ApiResponse(**orjson.loads(response.content))
 
-    async def send_switch_event(self, payload: SwitchEventPayload, access_token: str) -> Dict[str, Any]:
-        """Send switch event to the API"""
-        try:
-            url = f"{self.api_url}/api/v1/companies/{settings.company_id}/queues/call-external"
+    async def send_switch_event(self, location: Dict[str, Any], access_token: str, status: str = "calling") -> Dict[str, Any]:
+        """Send switch event to the API, location comes already validated from the user sync"""
+        url = f"{self.api_url}/api/v1/companies/{self.company_id}/queues/call-external"
 
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {access_token}",
-                "User-Agent": self.user_agent,
-            }
+        headers = self._event_headers.get(access_token)
+        if headers is None:
+            headers = self._headers | {"Authorization": f"Bearer {access_token}"}
+            self._event_headers[access_token] = headers
 
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(url, json=payload.model_dump(), headers=headers)
+        body: SwitchEventPayload = {
+            "location": location,
+            "branchId": self.device_id,
+            "isMultiService": False,
+            "status": status,
+        }
+        response = await self._client.post(url, content=orjson.dumps(body), headers=headers)
+
+        # Only the status code decides whether the event was delivered
+        if not response.is_success:
+            raise Exception(f"API returned status {response.status_code}")
 
-                if response.status_code in [200, 201]:
-                    logger.info("✅ Switch event sent successfully to API") if not is_prod_env else None
-                else:
-                    logger.warning(f"⚠️ API responded with status {response.status_code}")
+        logger.info("✅ Switch event sent successfully to API") if not is_prod_env else None
 
-                return response.json()
+        # The body is informative only, an empty or non JSON answer still counts as delivered
+        try:
+            return orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            return {"status": response.status_code}
 
-        except Exception as error:
-            logger.error(f"❌ Failed to send switch event to API: {error}")
-            raise
+    async def aclose(self) -> None:
+        """Close the shared HTTP client"""
+        await self._client.aclose()
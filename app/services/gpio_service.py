@@ -2,12 +2,13 @@
 
 import asyncio
 import os
-from datetime import datetime
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Set, Dict, Any, Optional
 from app.utils.logger_service import logger
+from app.utils.clock_service import now_iso
 
 from app.constants.pin_constants import SWITCH_PINS, BULB_PINS
-from app.models.models import SwitchEventPayload, UserLocation
+from app.models.models import GPIOStatus
 from app.services.api_service import ApiService
 from app.services.user_service import UserService
 from app.core.config import settings, is_prod_env
@@ -31,6 +32,7 @@ except ImportError:
         HIGH = 1
         LOW = 0
         PUD_UP = "PUD_UP"
+        FALLING = "FALLING"
 
 
         @staticmethod
@@ -42,7 +44,7 @@ except ImportError:
 
 
         @staticmethod
-        def setup(pin, mode, pull_up_down=None): pass
+        def setup(pin, mode, pull_up_down=None, initial=None): pass
 
 
         @staticmethod
@@ -53,25 +55,88 @@ except ImportError:
         def output(pin, value): pass
 
 
+        @staticmethod
+        def add_event_detect(pin, edge, callback=None, bouncetime=None): pass
+
+
+        @staticmethod
+        def remove_event_detect(pin): pass
+
+
         @staticmethod
         def cleanup(): pass
 
 
     GPIO = MockGPIO()
 
+# Debounce window for switch edge detection
+SWITCH_BOUNCE_TIME_MS = 50
+
+_TIME_ON_BULB = settings.time_on_bulb
+
+
+@lru_cache(maxsize = 1)
+def _docker_env() -> bool:
+    """Check if running in Docker container"""
+    try:
+        # Check for .dockerenv file
+        if os.path.exists("/.dockerenv"):
+            return True
+
+        # Check cgroup
+        with open("/proc/1/cgroup", "r") as f:
+            cgroup = f.read()
+
+        return "docker" in cgroup or "containerd" in cgroup
+
+    except Exception:
+        return False
+
+
+@lru_cache(maxsize = 1)
+def _has_gpio_export() -> bool:
+    return os.path.exists("/sys/class/gpio/export")
+
+
+@lru_cache(maxsize = 1)
+def _has_gpio_mem() -> bool:
+    return os.path.exists("/dev/gpiomem")
+
+
+@lru_cache(maxsize = 1)
+def _has_device_tree() -> bool:
+    return os.path.exists("/proc/device-tree/model")
+
+
+@lru_cache(maxsize = 1)
+def _device_model() -> str:
+    """Read the board model from the device tree"""
+    with open("/proc/device-tree/model", "r") as f:
+        return f.read().strip()
+
 
 class GPIOService:
-    def __init__(self):
-        self.api_service = ApiService()
-        self.user_service = UserService()
+    def __init__(self, api_service: Optional[ApiService] = None, user_service: Optional[UserService] = None):
+        self.api_service = api_service or ApiService()
+        self.user_service = user_service or UserService(self.api_service)
 
         # GPIO state
         self.gpio_available = False
         self.is_monitoring = False
-        self.switch_states = [False] * 5
+        self.switch_states = [False] * len(SWITCH_PINS)
+
+        # Environment probes do not change while the process runs
+        self.is_docker = _docker_env()
+        self.system_info = {
+            "hasGpioExport": _has_gpio_export(),
+            "hasGpioMem": _has_gpio_mem(),
+            "hasDeviceTree": _has_device_tree(),
+        }
 
-        # Monitoring tasks
-        self.monitoring_tasks: List[asyncio.Task] = []
+        # Switch presses dispatched from GPIO edge callbacks
+        self.press_tasks: Set[asyncio.Task] = set()
+        self._active_presses: Dict[int, asyncio.Task] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
 
 
     async def initialize(self) -> None:
@@ -84,7 +149,7 @@ class GPIOService:
 
             if not self.gpio_available:
                 logger.warning("⚠️ GPIO hardware not available - activating simulation mode")
-                logger.info("💡 Test switches using: GET /test/switch/{1-5}")
+                logger.info(f"💡 Test switches using: GET /test/switch/{{1-{len(SWITCH_PINS)}}}")
                 logger.info("🔧 All GPIO operations will be simulated")
                 return
 
@@ -108,24 +173,25 @@ class GPIOService:
         GPIO.setmode(GPIO.BCM)
         GPIO.setwarnings(False)
 
-        # Initialize switch pins (input with pull-up)
-        for i, pin in enumerate(SWITCH_PINS):
-            try:
-                GPIO.setup(pin, GPIO.IN, pull_up_down = GPIO.PUD_UP)
-                logger.info(f"✅ Switch {i + 1} initialized on GPIO {pin}")
-            except Exception as error:
-                logger.error(f"❌ Failed to initialize switch {i + 1} on GPIO {pin}: {error}")
-                raise
+        # Initialize switch pins (input with pull-up) and bulb pins (output, initially off)
+        self._setup_pins("switch", SWITCH_PINS, GPIO.IN, pull_up_down = GPIO.PUD_UP)
+        self._setup_pins("bulb", BULB_PINS, GPIO.OUT, initial = GPIO.LOW)
 
-        # Initialize bulb pins (output)
-        for i, pin in enumerate(BULB_PINS):
-            try:
-                GPIO.setup(pin, GPIO.OUT)
-                GPIO.output(pin, GPIO.LOW)  # Initially off
-                logger.info(f"✅ Bulb {i + 1} initialized on GPIO {pin}")
-            except Exception as error:
-                logger.error(f"❌ Failed to initialize bulb {i + 1} on GPIO {pin}: {error}")
-                raise
+        logger.info(f"✅ Initialized {len(SWITCH_PINS)} switches and {len(BULB_PINS)} bulbs")
+
+
+    def _setup_pins(self, label: str, pins: List[int], mode, **kwargs) -> None:
+        """Setup a group of pins in a single call"""
+        try:
+            GPIO.setup(list(pins), mode, **kwargs)
+        except Exception:
+            # Retry pin by pin to report which one failed
+            for i, pin in enumerate(pins):
+                try:
+                    GPIO.setup(pin, mode, **kwargs)
+                except Exception as error:
+                    logger.error(f"❌ Failed to initialize {label} {i + 1} on GPIO {pin}: {error}")
+                    raise
 
 
     async def _check_gpio_availability(self) -> bool:
@@ -135,14 +201,14 @@ class GPIOService:
                 return False
 
             # Check if running in Docker
-            is_docker = self._is_running_in_docker()
+            is_docker = self.is_docker
             if is_docker:
                 logger.info("🐋 Running in Docker container")
 
             # Check basic GPIO requirements
-            has_gpio_export = os.path.exists("/sys/class/gpio/export")
-            has_gpio_mem = os.path.exists("/dev/gpiomem")
-            has_device_tree = os.path.exists("/proc/device-tree/model")
+            has_gpio_export = self.system_info["hasGpioExport"]
+            has_gpio_mem = self.system_info["hasGpioMem"]
+            has_device_tree = self.system_info["hasDeviceTree"]
 
             logger.info(f"🔍 GPIO Check - Export: {has_gpio_export}, Memory: {has_gpio_mem}, DeviceTree: {has_device_tree}")
 
@@ -152,8 +218,7 @@ class GPIOService:
             # Check if it's actually a Raspberry Pi
             if has_device_tree:
                 try:
-                    with open("/proc/device-tree/model", "r") as f:
-                        model = f.read().strip()
+                    model = _device_model()
 
                     is_raspberry_pi = "Raspberry Pi" in model
                     logger.info(f"📱 Device: {model}")
@@ -182,23 +247,6 @@ class GPIOService:
             return False
 
 
-    def _is_running_in_docker(self) -> bool:
-        """Check if running in Docker container"""
-        try:
-            # Check for .dockerenv file
-            if os.path.exists("/.dockerenv"):
-                return True
-
-            # Check cgroup
-            with open("/proc/1/cgroup", "r") as f:
-                cgroup = f.read()
-
-            return "docker" in cgroup or "containerd" in cgroup
-
-        except Exception:
-            return False
-
-
     async def start_monitoring(self) -> None:
         """Start GPIO monitoring"""
         if self.is_monitoring:
@@ -210,38 +258,67 @@ class GPIOService:
 
         if not self.gpio_available:
             logger.info("📝 SIMULATION MODE: GPIO monitoring active")
-            logger.info("🧪 Test endpoints: GET /test/switch/{1-5}")
+            logger.info(f"🧪 Test endpoints: GET /test/switch/{{1-{len(SWITCH_PINS)}}}")
             return
 
-        # Start monitoring task for each switch
-        for i in range(len(SWITCH_PINS)):
-            task = asyncio.create_task(self._monitor_switch(i))
-            self.monitoring_tasks.append(task)
+        # Let the kernel wake us on switch edges instead of polling the pins
+        self._loop = asyncio.get_running_loop()
+        try:
+            for i, pin in enumerate(SWITCH_PINS):
+                GPIO.add_event_detect(
+                    pin,
+                    GPIO.FALLING,
+                    callback = lambda channel, switch_index = i + 1: self._on_switch_edge(switch_index),
+                    bouncetime = SWITCH_BOUNCE_TIME_MS
+                )
+
+        except Exception as error:
+            logger.error(f"❌ GPIO edge detection failed: {error}")
+            logger.warning("🔄 Falling back to simulation mode due to hardware error")
+
+            # Releases the detectors already added and the pins while still in hardware mode
+            await self.cleanup()
+            self.gpio_available = False
+            self.is_monitoring = True
+            logger.info("📝 SIMULATION MODE: GPIO monitoring active")
+            return
 
         logger.info("✅ HARDWARE MODE: Physical GPIO monitoring active")
 
 
-    async def _monitor_switch(self, switch_index: int) -> None:
-        """Monitor a specific switch for state changes"""
-        if not GPIO_AVAILABLE:
+    def _on_switch_edge(self, switch_index: int) -> None:
+        """Hand a switch edge from the RPi.GPIO thread over to the event loop"""
+        if self.is_monitoring and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._dispatch_switch_press, switch_index)
+
+
+    def _dispatch_switch_press(self, switch_index: int) -> None:
+        """Run a switch press as a task tracked until it finishes"""
+        # Ignore presses on a switch whose previous press is still running
+        if switch_index in self._active_presses:
+            logger.debug("⏳ Switch {switch_index} press ignored, previous press still running", switch_index = switch_index)
             return
 
-        pin = SWITCH_PINS[switch_index]
-        previous_state = GPIO.input(pin)
+        task = asyncio.create_task(self._handle_switch_edge(switch_index))
+        self._active_presses[switch_index] = task
+        self.press_tasks.add(task)
+        task.add_done_callback(self.press_tasks.discard)
+        task.add_done_callback(lambda task: self._release_switch(switch_index, task))
 
-        while self.is_monitoring:
-            try:
-                current_state = GPIO.input(pin)
 
-                # Detect rising edge (button press)
-                if previous_state == GPIO.HIGH and current_state == GPIO.LOW:
-                    await self.handle_switch_press(switch_index + 1)
+    def _release_switch(self, switch_index: int, task: asyncio.Task) -> None:
+        """Accept new presses on a switch once the task holding it finishes"""
+        if self._active_presses.get(switch_index) is task:
+            del self._active_presses[switch_index]
 
-                previous_state = current_state
-                await asyncio.sleep(0.01)  # 10ms polling interval
 
-            except Exception as error:
-                logger.error(f"❌ Error monitoring switch {switch_index + 1}: {error}")
+    async def _handle_switch_edge(self, switch_index: int) -> None:
+        """Handle a hardware switch press"""
+        try:
+            await self.handle_switch_press(switch_index)
+        except Exception:
+            # Already logged by handle_switch_press, only keep the task from failing
+            pass
 
 
     async def handle_switch_press(self, switch_index: int) -> Dict[str, Any]:
@@ -252,40 +329,48 @@ class GPIOService:
         logger.info(f"🔘 Switch (index: {switch_index}) activated (GPIO {SWITCH_PINS[switch_index - 1]})") if not is_prod_env else None
 
         try:
-            # Execute bulb control and API request concurrently
-            bulb_task = asyncio.create_task(self._turn_on_bulb(switch_index - 1))
-            api_task = asyncio.create_task(self._send_api_request(SWITCH_PINS[switch_index - 1]))
-
-            bulb_result, api_result = await asyncio.gather(bulb_task, api_task)
-
-            response = {
-                "turnOnBulb": bulb_result,
-                "sendApiRequest": api_result
-            }
+            # Execute bulb control and API request concurrently, a failure cancels the other
+            async with asyncio.TaskGroup() as task_group:
+                bulb_task = task_group.create_task(self._turn_on_bulb(switch_index - 1))
+                api_task = task_group.create_task(self._send_api_request(SWITCH_PINS[switch_index - 1]))
+
+        except ExceptionGroup as error_group:
+            error = error_group.exceptions[0]
+            logger.error(f"❌ Error handling switch {switch_index} press: {error}")
+
+            # Short blink to signal the failure without holding the caller, the switch stays busy until it ends
+            blink_task = asyncio.create_task(self._turn_on_bulb(switch_index - 1, 0.7))
+            self._active_presses[switch_index] = blink_task
+            self.press_tasks.add(blink_task)
+            blink_task.add_done_callback(self.press_tasks.discard)
+            blink_task.add_done_callback(lambda task: self._release_switch(switch_index, task))
+            raise error from error_group
+
+        response = {
+            "turnOnBulb": bulb_task.result(),
+            "sendApiRequest": api_task.result()
+        }
 
-            if not is_prod_env:
-                print('\n', response, '\n')
+        if not is_prod_env:
+            print('\n', response, '\n')
 
-            return response
+        return response
 
-        except Exception as error:
-            logger.error(f"❌ Error handling switch press: {error}")
-            self._turn_on_bulb(switch_index - 1, 0.7)
-            raise
 
-
-    async def _turn_on_bulb(self, bulb_index: int, time_on_bulb: int = settings.time_on_bulb) -> Dict[str, Any]:
+    async def _turn_on_bulb(self, bulb_index: int, time_on_bulb: float = _TIME_ON_BULB) -> Dict[str, Any]:
         bulb = bulb_index + 1
 
         """Turn on bulb for 2 seconds"""
         try:
             if not self.gpio_available:
                 # Simulation mode
-                logger.info(f"🔧 SIMULATION: Bulb {bulb} → ON")
+                logger.debug("🔧 SIMULATION: Bulb {bulb} → ON", bulb = bulb)
                 await asyncio.sleep(0.1)
-                logger.info(f"💡 SIMULATION: Bulb {bulb} illuminated (2s)")
-                await asyncio.sleep(time_on_bulb)
-                logger.info(f"🔧 SIMULATION: Bulb {bulb} → OFF")
+                logger.debug("💡 SIMULATION: Bulb {bulb} illuminated ({seconds}s)", bulb = bulb, seconds = time_on_bulb)
+                try:
+                    await asyncio.sleep(time_on_bulb)
+                finally:
+                    logger.debug("🔧 SIMULATION: Bulb {bulb} → OFF", bulb = bulb)
                 return {"hardware": False, "bulb": bulb, "gpio": None}
 
             # Hardware mode
@@ -295,12 +380,14 @@ class GPIOService:
             pin = BULB_PINS[bulb_index]
 
             GPIO.output(pin, GPIO.HIGH)
-            logger.info(f"💡 HARDWARE: Bulb {bulb} → ON (GPIO {pin})") if not is_prod_env else None
-
-            await asyncio.sleep(time_on_bulb)
+            logger.debug("💡 HARDWARE: Bulb {bulb} → ON (GPIO {pin})", bulb = bulb, pin = pin)
 
-            GPIO.output(pin, GPIO.LOW)
-            logger.info(f"💡 HARDWARE: Bulb {bulb} → OFF (GPIO {pin})") if not is_prod_env else None
+            try:
+                await asyncio.sleep(time_on_bulb)
+            finally:
+                # Also runs when the press is cancelled, never leave a bulb on
+                GPIO.output(pin, GPIO.LOW)
+                logger.debug("💡 HARDWARE: Bulb {bulb} → OFF (GPIO {pin})", bulb = bulb, pin = pin)
 
             return {"hardware": True, "bulb": bulb, "gpio": pin}
 
@@ -310,48 +397,31 @@ class GPIOService:
 
 
     async def _send_api_request(self, switch_index: int) -> Dict[str, Any]:
-        """Send API request for switch press"""
-        try:
-            user = self.user_service.get_user(switch_index)
+        """Send API request for switch press, failures are logged by handle_switch_press"""
+        user = await self.user_service.get_user(switch_index)
 
-            if not user:
-                logger.error(f"❌ No user found for switch pin {switch_index}")
-                return {"error": "No user found"}
+        if not user:
+            logger.error("❌ No user found for switch pin {pin}", pin = switch_index)
+            return {"error": "No user found"}
 
-            payload = SwitchEventPayload(
-                status = "calling",
-                branchId = settings.device_id,
-                isMultiService = False,
-                location = UserLocation(**user["location"])
-            )
+        logger.debug("📡 API: Sending request for switch index:{pin} (user: {user_id})", pin = switch_index, user_id = user["userId"])
+        return await self.api_service.send_switch_event(user["location"], user["accessToken"])
 
-            logger.info(f"📡 API: Sending request for switch index:{switch_index} (user: {user['userId']})") if not is_prod_env else None
-            response = await self.api_service.send_switch_event(payload, user["accessToken"])
 
-            return response
-
-        except Exception as error:
-            logger.error(f"❌ API: Failed for switch index:{switch_index}: {error}", backtrace = True)
-
-
-    def get_status(self) -> Dict[str, Any]:
+    def get_status(self) -> GPIOStatus:
         """Get GPIO service status"""
         return {
             "gpioAvailable": self.gpio_available,
             "mode": "hardware" if self.gpio_available else "simulation",
             "isMonitoring": self.is_monitoring,
-            "isDocker": self._is_running_in_docker(),
+            "isDocker": self.is_docker,
             "switchStates": self.switch_states,
             "switchPins": SWITCH_PINS,
             "bulbPins": BULB_PINS,
             "switchCount": len(SWITCH_PINS),
             "bulbCount": len(BULB_PINS),
-            "timestamp": datetime.now().isoformat(),
-            "systemInfo": {
-                "hasGpioExport": os.path.exists("/sys/class/gpio/export"),
-                "hasGpioMem": os.path.exists("/dev/gpiomem"),
-                "hasDeviceTree": os.path.exists("/proc/device-tree/model"),
-            }
+            "timestamp": now_iso(),
+            "systemInfo": self.system_info
         }
 
 
@@ -360,15 +430,15 @@ class GPIOService:
         logger.info("🧹 Cleaning up GPIO resources...")
         self.is_monitoring = False
 
-        # Cancel monitoring tasks
-        for task in self.monitoring_tasks:
+        # Cancel in-flight switch presses
+        for task in self.press_tasks:
             if not task.done():
                 task.cancel()
 
-        if self.monitoring_tasks:
-            await asyncio.gather(*self.monitoring_tasks, return_exceptions = True)
+        if self.press_tasks:
+            await asyncio.gather(*self.press_tasks, return_exceptions = True)
 
-        self.monitoring_tasks.clear()
+        self.press_tasks.clear()
 
         if not self.gpio_available or not GPIO_AVAILABLE:
             logger.info("✅ Cleanup completed (simulation mode)")
@@ -376,14 +446,16 @@ class GPIOService:
 
         try:
             # Turn off all bulbs
-            for i, pin in enumerate(BULB_PINS):
-                try:
-                    GPIO.output(pin, GPIO.LOW)
-                    logger.info(f"✅ Bulb {i + 1} turned off")
-                except Exception as error:
-                    logger.error(f"⚠️ Error turning off bulb {i + 1}: {error}")
+            try:
+                GPIO.output(list(BULB_PINS), GPIO.LOW)
+                logger.info(f"✅ {len(BULB_PINS)} bulbs turned off")
+            except Exception as error:
+                logger.error(f"⚠️ Error turning off bulbs: {error}")
+
+            # Stop edge detection and cleanup GPIO
+            for pin in SWITCH_PINS:
+                GPIO.remove_event_detect(pin)
 
-            # Cleanup GPIO
             GPIO.cleanup()
             logger.info("✅ Hardware cleanup completed")
 
@@ -1,50 +1,55 @@
 # app/services/user_service.py
 
-import json
-from pprint import pprint
 from typing import Optional, Dict, Any
+from sqlalchemy import bindparam
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from app.utils.logger_service import logger
 
 from app.core.database import database, users_table
 from app.services.api_service import ApiService
-from app.models.models import ApiUser
 from app.constants.pin_constants import SWITCH_PINS
-from app.core.config import is_prod_env
-
-
-def _upsert_user(api_user: ApiUser, switch_input: int) -> None:
-    """Insert or update user in database"""
-    location_string = json.dumps(api_user.location.model_dump())
-
-    # Check if user exists
-    query = users_table.select().where(users_table.c.userId == api_user.id)
-    existing_user = database.fetch_one(query)
-
-    if existing_user:
-        # Update existing user
-        query = users_table.update().where(
-            users_table.c.userId == api_user.id
-        ).values(
-            accessToken=api_user.accessToken,
-            location=location_string,
-        )
-        database.execute(query)
-    else:
-        # Create new user
-        query = users_table.insert().values(
-            userId=api_user.id,
-            accessToken=api_user.accessToken,
-            location=location_string,
-            switchInput=switch_input,
-        )
-        database.execute(query)
-
-    logger.info(f"👤 User {api_user.id} synchronized")
+from app.core.config import settings
+
+
+# Statements are built once, only their bound values change per call
+_select_users = users_table.select().order_by(users_table.c.id)
+_select_user_by_switch = users_table.select().where(users_table.c.switchInput == bindparam("switch_input")).order_by(users_table.c.id)
+
+# Insert new users or refresh the token and location of existing ones
+_upsert_users = sqlite_insert(users_table)
+_upsert_users = _upsert_users.on_conflict_do_update(
+    index_elements = [users_table.c.userId],
+    set_ = {
+        "accessToken": _upsert_users.excluded.accessToken,
+        "locationId": _upsert_users.excluded.locationId,
+        "locationName": _upsert_users.excluded.locationName,
+        "locationNumber": _upsert_users.excluded.locationNumber,
+    }
+)
+
+
+def _user_from_record(user_record) -> Dict[str, Any]:
+    """Convert a users row to a dict with its location columns grouped"""
+    return {
+        "id": user_record.id,
+        "userId": user_record.userId,
+        "accessToken": user_record.accessToken,
+        "switchInput": user_record.switchInput,
+        "createdAt": user_record.createdAt,
+        "location": {
+            "id": user_record.locationId,
+            "name": user_record.locationName,
+            "number": user_record.locationNumber,
+        },
+    }
 
 
 class UserService:
-    def __init__(self):
-        self.api_service = ApiService()
+    def __init__(self, api_service: Optional[ApiService] = None):
+        self.api_service = api_service or ApiService()
+
+        # Users keyed by switch pin, refreshed on every sync
+        self._users_by_switch: Dict[int, Dict[str, Any]] = {}
 
     async def fetch_and_store_users(self) -> None:
         """Fetch users from API and store them in database"""
@@ -59,43 +64,57 @@ class UserService:
 
             logger.info(f"📥 Received {len(api_response.users)} users from API")
 
-            # Process users sequentially to avoid database conflicts
-            for index, api_user in enumerate(api_response.users):
-                if index < len(SWITCH_PINS):
-                    _upsert_user(api_user, SWITCH_PINS[index])
-
-            logger.info("✅ Users synchronized successfully")
-
-            if not is_prod_env:
-                logger.warning("🔒 Sensitive data not logged in production environment")
-                all_users = database.fetch_all(users_table.select())
-                print('\n' + '-' * 40 + '\n')
-                for user in all_users:
-                    user_dict = {key: value for key, value in user._mapping.items()}
-                    pprint(user_dict)
-                    print('\n' + '-' * 40 + '\n')
-
-                logger.warning("🔒 Sensitive data not logged in production environment")
+            # Upsert every user assigned to a switch in a single statement
+            rows = [
+                {
+                    "userId": api_user.id,
+                    "accessToken": api_user.accessToken,
+                    "locationId": api_user.location.id,
+                    "locationName": api_user.location.name,
+                    "locationNumber": api_user.location.number,
+                    "switchInput": switch_input,
+                }
+                for api_user, switch_input in zip(api_response.users, SWITCH_PINS)
+            ]
+            await database.execute_many(_upsert_users, rows)
+
+            # Switch presses read users from memory instead of querying the database
+            all_users = await database.fetch_all(_select_users)
+            # The first row per switch wins, same as the database lookup on a cache miss
+            users_by_switch: Dict[int, Dict[str, Any]] = {}
+            for user_record in all_users:
+                if user_record.switchInput not in users_by_switch:
+                    users_by_switch[user_record.switchInput] = _user_from_record(user_record)
+            self._users_by_switch = users_by_switch
+
+            logger.info(f"👤 Synchronized {len(rows)} users")
+            logger.opt(lazy = True).debug("👤 Synchronized user ids: {}", lambda: [row["userId"] for row in rows])
+
+            # Users include access tokens, only dump them when explicitly requested
+            if settings.dump_users_on_startup:
+                logger.opt(lazy = True).info("👥 Users: {}", lambda: list(self._users_by_switch.values()))
 
         except Exception as error:
             logger.error(f"❌ Failed to fetch and store users: {error}")
             raise
 
-    def get_user(self, switch_index: int) -> Optional[Dict[str, Any]]:
+    async def get_user(self, switch_index: int) -> Optional[Dict[str, Any]]:
         """Get user by switch index"""
+        user = self._users_by_switch.get(switch_index)
+        if user is not None:
+            return user
+
         try:
-            query = users_table.select().where(users_table.c.switchInput == switch_index)
-            user_record = database.fetch_one(query)
+            user_record = await database.fetch_one(_select_user_by_switch, {"switch_input": switch_index})
 
             if not user_record:
                 logger.error("No users found")
                 return None
 
-            # Convert record to dict and parse location JSON
-            user_dict = dict(user_record)
-            user_dict["location"] = json.loads(user_dict["location"])
+            user = _user_from_record(user_record)
+            self._users_by_switch[switch_index] = user
 
-            return user_dict
+            return user
 
         except Exception as error:
             logger.error(f"Error fetching user: {error}")
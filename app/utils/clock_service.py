@@ -0,0 +1,28 @@
+# app/utils/clock_service.py
+
+import asyncio
+from datetime import datetime, timezone
+
+CLOCK_INTERVAL_SECONDS = 1.0
+
+
+def _format_now() -> str:
+    """Format the current UTC time with the resolution the clock refreshes at"""
+    return datetime.now(timezone.utc).isoformat(timespec = "seconds").replace("+00:00", "Z")
+
+
+_now_iso = _format_now()
+
+
+def now_iso() -> str:
+    """Get the current timestamp, refreshed every second by run_clock"""
+    return _now_iso
+
+
+async def run_clock() -> None:
+    """Refresh the cached timestamp until cancelled"""
+    global _now_iso
+
+    while True:
+        _now_iso = _format_now()
+        await asyncio.sleep(CLOCK_INTERVAL_SECONDS)
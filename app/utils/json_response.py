@@ -0,0 +1,13 @@
+# app/utils/json_response.py
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response serialized with orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
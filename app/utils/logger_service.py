@@ -1 +1,9 @@
+import sys
+
 from loguru import logger
+
+from app.core.config import is_prod_env
+
+# DEBUG lines are dropped before formatting in production
+logger.remove()
+logger.add(sys.stderr, level = "INFO" if is_prod_env else "DEBUG")
@@ -1,15 +1,20 @@
 # main.py
 
+import asyncio
 import os
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 import uvicorn
 from fastapi import FastAPI
+from app.utils.json_response import ORJSONResponse
 from app.utils.logger_service import logger
+from app.utils.clock_service import run_clock
 
-from app.core.config import is_prod_env
+from app.core.config import is_prod_env, settings
 from app.core.database import database
 from app.controllers.app_controller import router as app_router
+from app.middlewares.etag_middleware import ETagMiddleware
+from app.services.api_service import ApiService
 from app.services.gpio_service import GPIOService
 from app.services.user_service import UserService
 
@@ -21,19 +26,24 @@ async def lifespan(app: FastAPI):
 
     try:
         # Connect to database
-        database.connect()
+        await database.connect()
         logger.info("✅ Database connected successfully")
 
+        # Create the schema once at startup, skipped when it is managed externally
+        if settings.database_create_tables:
+            await database.create_tables()
+            logger.info("✅ Database tables ready")
+
         # Initialize services
         gpio_service = app.state.gpio_service
         user_service = app.state.user_service
 
-        # Initialize GPIO
-        await gpio_service.initialize()
+        # Initialize GPIO while users are fetched from the API, both are independent
+        await asyncio.gather(
+            gpio_service.initialize(),
+            user_service.fetch_and_store_users()
+        )
         logger.info("✅ GPIO initialized successfully")
-
-        # Fetch and store users from API
-        await user_service.fetch_and_store_users()
         logger.info("✅ Users synchronized with API")
 
         # Start GPIO monitoring
@@ -46,13 +56,22 @@ async def lifespan(app: FastAPI):
         logger.error(f"❌ Failed to initialize application: {error}")
         raise
 
+    # Refresh the shared timestamp once per second instead of per request
+    clock_task = asyncio.create_task(run_clock())
+
     yield
 
     # Cleanup
     logger.info("🧹 Shutting down application...")
     gpio_service = app.state.gpio_service
     await gpio_service.cleanup()
+    await app.state.api_service.aclose()
     await database.disconnect()
+
+    clock_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await clock_task
+
     logger.info("✅ Application shutdown completed")
 
 
@@ -62,12 +81,17 @@ def create_app() -> FastAPI:
         title="Raspberry Pi GPIO Controller",
         description="GPIO Controller API for Raspberry Pi 4B",
         version="1.0.0",
+        default_response_class=ORJSONResponse,
         lifespan=lifespan
     )
 
-    # Initialize services
-    app.state.gpio_service = GPIOService()
-    app.state.user_service = UserService()
+    # Initialize services sharing a single HTTP client
+    app.state.api_service = ApiService()
+    app.state.user_service = UserService(app.state.api_service)
+    app.state.gpio_service = GPIOService(app.state.api_service, app.state.user_service)
+
+    # Middlewares
+    app.add_middleware(ETagMiddleware)
 
     # Include routers
     app.include_router(app_router)
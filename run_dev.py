@@ -16,6 +16,10 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=port,
         reload=True,
+        # Watch Python sources only (main.py included) and skip heavy directories, polling them is slow on an SD card
+        reload_includes=["*.py"],
+        reload_excludes=[".git", "data", "venv", ".venv", "__pycache__"],
+        reload_delay=1.0,
         log_level="info",
         access_log=True
     )